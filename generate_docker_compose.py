@@ -1,22 +1,60 @@
 import json
+import os
 import yaml
 from collections import defaultdict
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Tuple
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as YamlDumper
+
+# Topology files above this size are streamed with ijson (if installed);
+# smaller ones are cheaper to parse in a single call.
+STREAM_THRESHOLD = 8 * 1024 * 1024
 
 def read_topology(filename: str) -> Dict:
     """
     Read network topology from a JSON file.
     
+    Files larger than STREAM_THRESHOLD are parsed incrementally, so the raw
+    document is never held in memory alongside the parsed topology.
+    
     Args:
         filename (str): Path to the JSON topology file
         
     Returns:
         dict: Dictionary containing network topology data
     """
-    with open(filename, "r") as f:
-        return json.load(f)
+    if ijson is not None and os.path.getsize(filename) > STREAM_THRESHOLD:
+        with open(filename, "rb") as f:
+            subnets = list(ijson.items(f, "subnets.item"))
+            f.seek(0)
+            edges = list(ijson.items(f, "edges.item"))
+        return {"subnets": subnets, "edges": edges}
+    
+    with open(filename, "rb") as f:
+        data = f.read()
+    if simdjson is not None:
+        return simdjson.Parser().parse(data).as_dict()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
 
-def extract_router_connections(topology: Dict) -> Tuple[Set[str], List[Tuple[str, str, int]], List[Dict]]:
+def extract_router_connections(topology: Dict) -> Tuple[List[str], List[Tuple[str, str, int]], Dict[str, List[str]]]:
     """
     Extract router connections and information from topology.
     
@@ -25,25 +63,26 @@ def extract_router_connections(topology: Dict) -> Tuple[Set[str], List[Tuple[str
         
     Returns:
         tuple: Contains:
-            - set of router names
+            - list of router names in numeric order (R1, R2, ..., R10)
             - list of connections (origin, destination, weight)
-            - list of subnet information
+            - dictionary mapping each router to its hosts
     """
     routers = set()
     connections = []
+    hosts_by_router = {}
     
     for subnet in topology["subnets"]:
         router = subnet["router"]
         routers.add(router)
+        hosts_by_router[router] = subnet["hosts"]
         
     for edge in topology["edges"]:
-        if edge["node1"].startswith("R") and edge["node2"].startswith("R"):
+        if edge["node1"] in routers and edge["node2"] in routers:
             connections.append((edge["node1"], edge["node2"], edge["weight"]))
-            routers.update([edge["node1"], edge["node2"]])
             
-    return routers, connections, topology["subnets"]
+    return sorted(routers, key=lambda router: int(router[1:])), connections, hosts_by_router
 
-def create_connection_map(connections: List[Tuple[str, str, int]]) -> Dict[str, List[str]]:
+def create_connection_map(connections: List[Tuple[str, str, int]]) -> Dict[str, List[Tuple[str, int]]]:
     """
     Create a map of router connections.
     
@@ -51,54 +90,68 @@ def create_connection_map(connections: List[Tuple[str, str, int]]) -> Dict[str,
         connections (list): List of router connections
         
     Returns:
-        dict: Dictionary mapping routers to their connections
+        dict: Dictionary mapping routers to their incident links (neighbor, weight)
     """
     connections_per_router = defaultdict(list)
     for origin, dest, weight in connections:
-        connections_per_router[origin].append(dest)
-        connections_per_router[dest].append(origin)
+        connections_per_router[origin].append((dest, weight))
+        connections_per_router[dest].append((origin, weight))
     return connections_per_router
 
-def create_network_structure(connections: List[Tuple[str, str, int]], subnet_count: int) -> Tuple[Dict, Dict, Dict, int]:
+def create_network_config(subnet: str) -> Dict:
+    """
+    Create a bridge network configuration for docker-compose.
+    
+    Args:
+        subnet (str): Network subnet in CIDR notation
+        
+    Returns:
+        dict: Network configuration
+    """
+    return {"driver": "bridge", "ipam": {"config": [{"subnet": subnet}]}}
+
+def create_network_structure(connections: List[Tuple[str, str, int]], subnet_count: int,
+                             networks: Dict) -> Tuple[Dict, Dict, int]:
     """
     Create network structure with subnets and IP mappings.
     
     Args:
         connections (list): List of router connections
         subnet_count (int): Initial subnet counter
+        networks (dict): docker-compose networks section, filled in place
         
     Returns:
         tuple: Contains:
-            - networks dictionary
             - IP mapping dictionary
-            - subnet cost dictionary
+            - inter-router network dictionary, keyed by (router, neighbor)
             - updated subnet count
     """
-    subnet_base = "10.10.{0}.0/24"
-    ip_base = "10.10.{0}.{1}"
-    networks = {}
     ip_map = defaultdict(dict)
-    subnet_cost = {}
+    inter_router_networks = {}
     
     for origin, dest, weight in connections:
         net_name = f"{origin.lower()}_{dest.lower()}_net"
-        subnet = subnet_base.format(subnet_count)
-        ip_map[origin][net_name] = ip_base.format(subnet_count, 2)
-        ip_map[dest][net_name] = ip_base.format(subnet_count, 3)
-        networks[net_name] = subnet
-        subnet_cost[net_name] = weight
+        prefix = f"10.10.{subnet_count}"
+        subnet = f"{prefix}.0/24"
+        ip_map[origin][net_name] = f"{prefix}.2"
+        ip_map[dest][net_name] = f"{prefix}.3"
+        networks[net_name] = create_network_config(subnet)
+        inter_router_networks[(origin, dest)] = net_name
+        inter_router_networks[(dest, origin)] = net_name
         subnet_count += 1
         
-    return networks, ip_map, subnet_cost, subnet_count
+    return ip_map, inter_router_networks, subnet_count
 
-def create_router_service(router: str, ip_map: Dict, subnet_cost: Dict, subnet_count: int) -> Tuple[Dict, str, str, str]:
+def create_router_service(router: str, ip_map: Dict, connections_per_router: Dict,
+                          inter_router_networks: Dict, subnet_count: int) -> Tuple[Dict, str, str, str]:
     """
     Create a router service configuration.
     
     Args:
         router (str): Router name
         ip_map (dict): IP mapping dictionary
-        subnet_cost (dict): Subnet cost dictionary
+        connections_per_router (dict): Incident links (neighbor, weight) per router
+        inter_router_networks (dict): Network name per (router, neighbor) pair
         subnet_count (int): Current subnet count
         
     Returns:
@@ -108,33 +161,36 @@ def create_router_service(router: str, ip_map: Dict, subnet_cost: Dict, subnet_c
             - host subnet
             - gateway IP
     """
-    host_subnet_base = "192.168.{0}.0/24"
-    host_ip_base = "192.168.{0}.{1}"
+    router_name = router.lower()
+    links = connections_per_router[router]
+    router_ips = ip_map[router]
+    router_nets = [inter_router_networks[(router, neighbor)] for neighbor, _ in links]
+    
+    host_net = f"{router_name}_hosts_net"
+    host_prefix = f"192.168.{subnet_count}"
+    host_subnet = f"{host_prefix}.0/24"
+    gateway_ip = f"{host_prefix}.2"
     
     service = {
         "build": {"context": ".", "dockerfile": "router/Dockerfile"},
-        "container_name": router.lower(),
-        "environment": {"CONTAINER_NAME": router.lower()},
+        "container_name": router_name,
+        "environment": {
+            "CONTAINER_NAME": router_name,
+            **{f"CONNECTED_TO_ROUTER_{neighbor.lower()}": str(weight) for neighbor, weight in links},
+        },
         "volumes": ['./router/router.py:/app/router.py'],
-        "networks": {},
+        "networks": {
+            **{net: {"ipv4_address": router_ips[net]} for net in router_nets},
+            host_net: {"ipv4_address": gateway_ip},
+        },
         "cap_add": ["NET_ADMIN"],
         "sysctls": ["net.ipv4.ip_forward=1", "net.ipv4.conf.all.accept_redirects=0"
 , "net.ipv4.conf.all.send_redirects=0"]
     }
     
-    for net, ip in ip_map[router].items():
-        service["networks"][net] = {"ipv4_address": ip}
-        service["environment"][f'CONNECTED_TO_ROUTER_{net.split("_")[0]}'] = str(subnet_cost[net])
-
-    
-    host_net = f"{router.lower()}_hosts_net"
-    host_subnet = host_subnet_base.format(subnet_count)
-    gateway_ip = host_ip_base.format(subnet_count, 2)
-    service["networks"][host_net] = {"ipv4_address": gateway_ip}
-    
     return service, host_net, host_subnet, gateway_ip
 
-def create_host_service(host: str, router: str, host_net: str, host_ip: str) -> Dict:
+def create_host_service(host: str, router: str, host_net: str, host_ip: str, gateway_ip: str) -> Dict:
     """
     Create a host service configuration.
     
@@ -143,18 +199,19 @@ def create_host_service(host: str, router: str, host_net: str, host_ip: str) ->
         router (str): Router name
         host_net (str): Host network name
         host_ip (str): Host IP address
+        gateway_ip (str): IP address of the router on the host network
         
     Returns:
         dict: Host service configuration
     """
-    gateway_ip = f"192.168.{host_ip.split('.')[2]}.2"  
+    host_name = host.lower()
     return {
         "build": {"context": ".", "dockerfile": "host/Dockerfile"},
-        "container_name": host.lower(),
+        "container_name": host_name,
         "networks": {host_net: {"ipv4_address": host_ip}},
         "environment": [
             f"CONNECTED_TO={router}",
-            f"CONTAINER_NAME={host.lower()}",
+            f"CONTAINER_NAME={host_name}",
             f"GATEWAY_IP={gateway_ip}"  
         ],
         "cap_add": ["NET_ADMIN"],
@@ -174,50 +231,41 @@ def generate_docker_compose(topology_file: str = "topologies/network_topology.js
     """
     # Read topology and extract information
     topology = read_topology(topology_file)
-    routers, connections, subnets = extract_router_connections(topology)
+    routers, connections, hosts_by_router = extract_router_connections(topology)
     connections_per_router = create_connection_map(connections)
     
     # Initialize docker-compose structure
     docker_compose = {"services": {}, "networks": {}}
     
     # Create network structure
-    networks, ip_map, subnet_cost, subnet_count = create_network_structure(connections, 1)
+    ip_map, inter_router_networks, subnet_count = create_network_structure(
+        connections, 1, docker_compose["networks"]
+    )
     
     # Create services for routers and hosts
-    for router in sorted(routers):
+    for router in routers:
         # Create router service
         service, host_net, host_subnet, gateway_ip = create_router_service(
-            router, ip_map, subnet_cost, subnet_count
-        )
-        docker_compose["services"][router.lower()] = service
-        networks[host_net] = host_subnet
-        
-        # Find and create host services
-        router_hosts = next(
-            (subnet["hosts"] for subnet in subnets if subnet["router"] == router),
-            []
+            router, ip_map, connections_per_router, inter_router_networks, subnet_count
         )
+        docker_compose["services"][service["container_name"]] = service
+        docker_compose["networks"][host_net] = create_network_config(host_subnet)
         
-        for idx, host in enumerate(router_hosts):
+        # Create host services
+        for idx, host in enumerate(hosts_by_router.get(router, [])):
             host_ip = f"192.168.{subnet_count}.{idx + 3}"
-            docker_compose["services"][host.lower()] = create_host_service(
-                host, router, host_net, host_ip
-            )
+            host_service = create_host_service(host, router, host_net, host_ip, gateway_ip)
+            docker_compose["services"][host_service["container_name"]] = host_service
         
         subnet_count += 1
     
-    # Add networks to docker-compose
-    docker_compose["networks"] = {
-        net: {
-            "driver": "bridge",
-            "ipam": {"config": [{"subnet": subnet}]}
-        }
-        for net, subnet in networks.items()
-    }
-    
-    # Save to file
-    with open("docker-compose.yml", "w") as f:
-        yaml.dump(docker_compose, f, default_flow_style=False, sort_keys=False)
+    # Save to file (JSON is valid YAML, so Compose reads the orjson output as-is)
+    if orjson is not None:
+        with open("docker-compose.yml", "wb") as f:
+            f.write(orjson.dumps(docker_compose, option=orjson.OPT_INDENT_2))
+    else:
+        with open("docker-compose.yml", "w") as f:
+            yaml.dump(docker_compose, f, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
     
     print("docker-compose.yml file has been generated with updated network logic.")
 
@@ -1,7 +1,12 @@
 import networkx as nx
-import matplotlib.pyplot as plt
 import random
 import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def create_subnet(G, subnet_index: int):
     """
@@ -19,32 +24,42 @@ def create_subnet(G, subnet_index: int):
     host1 = f"H{subnet_index*2+1}"
     host2 = f"H{subnet_index*2+2}"
     
-    G.add_node(router, type="router")
-    G.add_node(host1, type="host")
-    G.add_node(host2, type="host")
-    
-    G.add_edge(host1, router)
-    G.add_edge(host2, router)
+    G.add_nodes_from([(router, {"type": "router"}), (host1, {"type": "host"}), (host2, {"type": "host"})])
+    G.add_edges_from([(host1, router), (host2, router)])
     
     return {"router": router, "hosts": [host1, host2]}
 
-def connect_routers(G, routers: list):
+def connect_routers(G, routers: list, rng: random.Random = None):
     """
     Connect routers in a topology with random weights.
     
+    Routers are always chained in order (routers[i] - routers[i + 1]) before
+    any random links are added, and every host is attached to its subnet
+    router, so the resulting graph is connected by construction.
+    
     Args:
         G (nx.Graph): The network graph
         routers (list): List of router names
+        rng (random.Random, optional): Random generator (default: unseeded generator)
     """
+    rng = rng or random.Random()
+    n = len(routers)
+    
+    # Draw one weight per possible router pair up front
+    weights = iter(rng.choices(range(1, 11), k=n * (n - 1) // 2))
+    
     # Create initial chain connectivity
-    for i in range(len(routers) - 1):
-        G.add_edge(routers[i], routers[i + 1], weight=random.randint(1, 10))
+    G.add_weighted_edges_from(
+        (routers[i], routers[i + 1], next(weights)) for i in range(n - 1)
+    )
     
     # Add additional random connections with lower probability
-    for i in range(len(routers)):
-        for j in range(i + 2, len(routers)):
-            if random.random() > 0.9:  
-                G.add_edge(routers[i], routers[j], weight=random.randint(1, 10))
+    G.add_weighted_edges_from(
+        (routers[i], routers[j], next(weights))
+        for i in range(n)
+        for j in range(i + 2, n)
+        if rng.random() > 0.9
+    )
 
 def custom_grid_layout(G, rows=None, cols=None):
     """
@@ -73,17 +88,29 @@ def custom_grid_layout(G, rows=None, cols=None):
     
     return pos
 
-def visualize_network(G, filename: str, layout_type="circular"):
+def visualize_network(G, filename: str, layout_type="circular", ax=None):
     """
     Visualize and save the network topology with only routers, using a specified layout.
     
     Args:
         G (nx.Graph): The network graph
         filename (str): Path to save the image
-        layout_type (str): Type of layout ("circular" for sphere)
+        layout_type (str): Type of layout ("circular" for sphere, "grid", anything else
+            for a force-directed layout)
+        ax (matplotlib.axes.Axes, optional): Axes to clear and draw on, so one figure can
+            be reused across calls (default: a new figure, closed after saving)
     """
+    # Imported here so JSON-only runs (LINKSTATE_PLOT=0) skip loading matplotlib
+    import matplotlib.pyplot as plt
+    
+    owns_figure = ax is None
+    if owns_figure:
+        _, ax = plt.subplots(figsize=(10, 8))
+    else:
+        ax.clear()
+    
     # Create a subgraph with only router nodes
-    router_nodes = [node for node, data in G.nodes(data=True) if data["type"] == "router"]
+    router_nodes = [node for node, node_type in G.nodes(data="type") if node_type == "router"]
     router_subgraph = G.subgraph(router_nodes)
     
     # Choose layout based on layout_type
@@ -92,22 +119,24 @@ def visualize_network(G, filename: str, layout_type="circular"):
     elif layout_type == "grid":
         pos = custom_grid_layout(router_subgraph)
     else:
-        pos = nx.spring_layout(router_subgraph)
-    
-    plt.figure(figsize=(10, 8))
-    nx.draw_networkx_nodes(router_subgraph, pos, node_color='lightblue', node_size=500, label='Routers')
-    nx.draw_networkx_edges(router_subgraph, pos)
-    
-    edge_labels = {(u, v): d["weight"] for u, v, d in router_subgraph.edges(data=True) 
-                  if "weight" in d}
-    nx.draw_networkx_edge_labels(router_subgraph, pos, edge_labels=edge_labels, label_pos=0.8)
-    nx.draw_networkx_labels(router_subgraph, pos)
-    
-    plt.title(f"Network Topology - (Routers Only)")
-    plt.legend()
-    plt.axis('off')  # Remove axes for cleaner image
-    plt.savefig(filename)
-    plt.close()  # Close the figure to free memory
+        try:
+            pos = nx.kamada_kawai_layout(router_subgraph)
+        except ImportError:  # kamada_kawai_layout requires scipy
+            pos = nx.spring_layout(router_subgraph)
+    
+    nx.draw_networkx_nodes(router_subgraph, pos, node_color='lightblue', node_size=500, label='Routers', ax=ax)
+    nx.draw_networkx_edges(router_subgraph, pos, ax=ax)
+    
+    edge_labels = {(u, v): w for u, v, w in router_subgraph.edges(data="weight") if w is not None}
+    nx.draw_networkx_edge_labels(router_subgraph, pos, edge_labels=edge_labels, label_pos=0.8, ax=ax)
+    nx.draw_networkx_labels(router_subgraph, pos, ax=ax)
+    
+    ax.set_title(f"Network Topology - (Routers Only)")
+    ax.legend()
+    ax.set_axis_off()  # Remove axes for cleaner image
+    ax.figure.savefig(filename)
+    if owns_figure:
+        plt.close(ax.figure)  # Close the figure to free memory
 
 def save_topology(G, subnets, filename):
     """
@@ -127,46 +156,55 @@ def save_topology(G, subnets, filename):
             } for i, subnet in enumerate(subnets)
         ],
         "edges": [
-            {
-                "node1": edge[0],
-                "node2": edge[1],
-                "weight": edge[2].get("weight", None)
-            } for edge in G.edges(data=True)
+            {"node1": u, "node2": v, "weight": w}
+            for u, v, w in G.edges(data="weight", default=None)
         ]
     }
     
-    with open(filename, "w") as f:
-        json.dump(topology, f, indent=4)
+    if orjson is not None:
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(topology, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filename, "w") as f:
+            json.dump(topology, f, indent=4)
 
-def main():
-    """Main function to generate network topology."""
-    for topologies in range(4):
+def main(seed: int = None):
+    """
+    Main function to generate network topology.
+    
+    Args:
+        seed (int, optional): Seed for reproducible topologies (default: random)
+    """
+    rng = random.Random(seed)
+    plot = os.environ.get("LINKSTATE_PLOT", "1") != "0"
+    if plot:
+        import matplotlib.pyplot as plt
+        
+        # One figure is reused for every topology size
+        fig, ax = plt.subplots(figsize=(10, 8))
+    
+    for num_subnets in [5, 10, 15, 20]:
         G = nx.Graph()
-        num_subnets = [5, 10, 15, 20]
         subnets = []
         
         # Create subnets
-        for i in range(num_subnets[topologies]):
+        for i in range(num_subnets):
             subnet = create_subnet(G, i)
             subnets.append(subnet)
         
         # Connect routers
         routers = [subnet["router"] for subnet in subnets]
-        connect_routers(G, routers)
-        
-        # Ensure connectivity
-        if not nx.is_connected(G):
-            print("Warning: Graph is not connected! Adjusting...")
-            for i in range(len(routers) - 1):
-                G.add_edge(routers[i], routers[i + 1], weight=random.randint(1, 10))
+        connect_routers(G, routers, rng)
         
         # Visualize and save
-        visualize_network(G, f"topologies/network_topology_{num_subnets[topologies]}.png", layout_type="grid")
-        save_topology(G, subnets, f"topologies/network_topology_{num_subnets[topologies]}.json")
+        if plot:
+            visualize_network(G, f"topologies/network_topology_{num_subnets}.png", layout_type="grid", ax=ax)
+        save_topology(G, subnets, f"topologies/network_topology_{num_subnets}.json")
         
-        G.clear()
-        subnets.clear()
         print("Network topology has been generated and saved.")
+    
+    if plot:
+        plt.close(fig)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,46 +1,41 @@
 import os
 import time
 import sys
+import signal
 import socket
 import subprocess
-import ipaddress
+import psutil
 
 """ ----------------------------------------------------------------------------
     This script implements a network host configuration system that:
     - Retrieves network configuration from environment variables
     - Discovers the host's IP address
     - Calculates and configures the default gateway
-    - Maintains a continuous running state
+    - Maintains a continuous running state (idle, or a heartbeat log with HOST_HEARTBEAT=1)
 
     Dependencies:
     - Python standard libraries
+    - psutil (interface address lookup)
     - Linux networking tools (ip command)
 """
 
-def get_host_ip():
+def get_host_ip(interface: str = "eth0"):
     """
-    Discovers the host's IP address using either socket connection or interface parsing.
+    Reads the host's IPv4 address directly from a network interface.
+    
+    Args:
+        interface (str): Interface to read the address from (default: eth0)
     
     Returns:
         str: The host's IP address or None if discovery fails
     """
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.settimeout(0)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
+        for address in psutil.net_if_addrs().get(interface, []):
+            if address.family == socket.AF_INET:
+                return address.address
     except Exception as e:
-        print(f"Error getting host IP: {e}")
-        try:
-            result = subprocess.run(["ip", "-4", "addr", "show", "eth0"], capture_output=True, text=True)
-            for line in result.stdout.splitlines():
-                if "inet" in line:
-                    return line.split()[1].split("/")[0]
-        except Exception as e:
-            print(f"Error parsing IP from eth0: {e}")
-            return None
+        print(f"Error reading IP from {interface}: {e}")
+    return None
 
 
 def configure_gateway(gateway_ip):
@@ -54,12 +49,8 @@ def configure_gateway(gateway_ip):
         bool: True if configuration succeeds, False otherwise
     """
     try:
-        subprocess.run(["ip", "route", "del", "default"], check=True, capture_output=True)
-    except subprocess.CalledProcessError:
-        pass
- 
-    try:
-        subprocess.run(["ip", "route", "add", "default", "via", gateway_ip], check=True, capture_output=True)
+        # "replace" swaps any existing default route in a single netlink request
+        subprocess.run(["ip", "route", "replace", "default", "via", gateway_ip], check=True, capture_output=True)
         print(f"Default gateway configured to {gateway_ip}")
         return True
     except subprocess.CalledProcessError as e:
@@ -93,9 +84,14 @@ def main():
         if not configure_gateway(gateway_ip):
             return 1
 
-        while True:
-            print(f"Host {host_ip} is running with gateway {gateway_ip}...")
-            time.sleep(15)
+        # Periodic heartbeat is only useful for debugging; otherwise sleep in the kernel
+        if os.getenv("HOST_HEARTBEAT") == "1":
+            while True:
+                print(f"Host {host_ip} is running with gateway {gateway_ip}...")
+                time.sleep(15)
+
+        print(f"Host {host_ip} is running with gateway {gateway_ip}")
+        signal.pause()
 
     except Exception as e:
         print(f"Host failed with error: {e}")
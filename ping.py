@@ -1,9 +1,19 @@
 import subprocess
 import re
+from concurrent.futures import ThreadPoolExecutor
 from statistics import mean
 import tracemalloc
+import yaml
 from generate_docker_compose import generate_docker_compose
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader
+
+PING_WORKERS = 64  # Origins tested concurrently
+LATENCY_RE = re.compile(rb"time=([\d.]+)\s*ms")  # Matched against raw ping output
+
 def load_docker_compose() -> tuple:
     """
     Load docker-compose.yml and extract host IPs and container names.
@@ -21,24 +31,20 @@ def load_docker_compose() -> tuple:
     """
     ip_to_container = {}
     hosts = []
-    current_container = None
     
     try:
         with open("docker-compose.yml", "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                # Extract container name
-                container_match = re.search(r"container_name:\s*\"?([^\"\n]+)", line)
-                if container_match:
-                    current_container = container_match.group(1)
-                    if "h" in current_container.lower():
-                        hosts.append(current_container)
-                
-                # Extract IPv4 address and associate with the current container
-                ip_match = re.search(r"ipv4_address:\s*\"?([^\"\n]+)", line)
-                if ip_match and current_container:
-                    ip = ip_match.group(1)
-                    ip_to_container[ip] = current_container
+            compose = yaml.load(f, Loader=YamlLoader)
+
+        for service_name, service in compose["services"].items():
+            container = service.get("container_name", service_name)
+            if "h" in container.lower():
+                hosts.append(container)
+
+            # Associate every IPv4 address of the container with its name
+            for network in service.get("networks", {}).values():
+                if network and "ipv4_address" in network:
+                    ip_to_container[network["ipv4_address"]] = container
     except FileNotFoundError:
         print("Error: docker-compose.yml not found.")
         return {}, []
@@ -48,17 +54,110 @@ def load_docker_compose() -> tuple:
     
     return ip_to_container, hosts
 
-def test_connectivity(ip_to_container: dict, hosts: list) -> list:
+class PingShell:
+    """
+    Persistent shell inside a container used to run many pings while paying the
+    `docker exec` start-up cost only once.
+
+    Attributes:
+        _origin (str): Name of the container the pings are issued from
+        _process (subprocess.Popen): The `docker exec -i <origin> sh` process
+    """
+
+    SENTINEL = b"__DONE__"
+
+    def __init__(self, origin: str):
+        """
+        Opens the shell session.
+
+        Args:
+            origin (str): Name of the container the pings are issued from
+        """
+        self._origin = origin
+        self._process = subprocess.Popen(
+            ["docker", "exec", "-i", origin, "sh"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def ping(self, ip: str) -> tuple:
+        """
+        Sends a single ping and waits for its result.
+
+        Args:
+            ip (str): Destination IP address
+
+        Returns:
+            tuple: (success, latency) where latency is in milliseconds, or None on failure.
+        """
+        try:
+            self._process.stdin.write(f"ping -c 1 -W 1 {ip} 2>/dev/null; echo __DONE__:$?\n".encode())
+            self._process.stdin.flush()
+        except OSError:
+            return False, None
+
+        latency = 0.0
+        for line in self._process.stdout:
+            if line.startswith(self.SENTINEL):
+                break
+            latency_match = LATENCY_RE.search(line)
+            if latency_match:
+                latency = float(latency_match.group(1))
+        else:
+            return False, None  # Shell exited before answering
+
+        if line.rstrip() != self.SENTINEL + b":0":
+            return False, None
+        return True, latency
+
+    def close(self):
+        """
+        Ends the shell session.
+        """
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+def ping_from(origin: str, targets: list) -> list:
+    """
+    Ping every target from a single origin container over one shell session.
+
+    Args:
+        origin (str): Name of the container the pings are issued from.
+        targets (list): List of (dest_ip, dest_name) tuples.
+
+    Returns:
+        list: (origin, dest_ip, dest_name, success, latency) tuples, in target order.
+    """
+    with PingShell(origin) as shell:
+        return [(origin, dest_ip, dest_name, *shell.ping(dest_ip)) for dest_ip, dest_name in targets]
+
+def test_connectivity(ip_to_container: dict, hosts: list, workers: int = PING_WORKERS) -> list:
     """
     Test ping connectivity between all pairs of hosts and display detailed results.
 
     This function performs ping tests from each host to all other hosts (excluding self-ping),
     collects latency data for successful pings, and provides a formatted output including
-    per-host and global statistics.
+    per-host and global statistics. Each origin pings through its own persistent shell,
+    origins run concurrently on a thread pool and results are printed once all of them
+    have completed.
 
     Args:
         ip_to_container (dict): Mapping of IP address to container name.
         hosts (list): List of host container names.
+        workers (int, optional): Number of origins tested concurrently (default: PING_WORKERS).
 
     Note:
         The ping command uses -c 1 (1 packet) and -W 1 (1-second timeout) for efficiency.
@@ -68,11 +167,22 @@ def test_connectivity(ip_to_container: dict, hosts: list) -> list:
     global_fail = 0
     total_tests = 0
     avg_latency = 0
-    avg_peak = 0
     global_latencies = []
-    global_peak  = []
     per_host_stats = {}
 
+    targets = {
+        origin: [(dest_ip, dest_name) for dest_ip, dest_name in ip_to_container.items() if dest_name != origin]
+        for origin in hosts
+    }
+
+    tracemalloc.start()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(ping_from, hosts, (targets[origin] for origin in hosts)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results_per_host = dict(zip(hosts, results))
+
     print("=" * 50)
     print(f"{'Host Connectivity Test':^50}")
     print("=" * 50)
@@ -88,44 +198,17 @@ def test_connectivity(ip_to_container: dict, hosts: list) -> list:
         success = 0
         fail = 0
         total_tests += len(ip_to_container) - 1  # Exclude self-ping
-        latencies = []
 
-        
-        # Iterate over all IPs and containers, excluding self-ping
-        tracemalloc.start()
-
-        for dest_ip in ip_to_container.keys():
-            dest_name = ip_to_container[dest_ip]
-            if origin == dest_name:
-                continue
-            
-            try:
-                result = subprocess.run(
-                    ["docker", "exec", origin, "ping", "-c", "1", "-W", "1", dest_ip],
-                    capture_output=True,
-                    text=True,
-                    timeout=1
-                )
-                if result.returncode == 0:
-                    latency_match = re.search(r"time=([\d.]+)\s*ms", result.stdout)
-                    latency = float(latency_match.group(1)) if latency_match else 0.0
-                    print(f"{dest_ip:<15} {dest_name:<12} {'✔️':<8} {latency:>6.2f} ms")
-                    success += 1
-                    global_success += 1
-                    latencies.append(latency)
-                    global_latencies.append(latency)
-                else:
-                    print(f"{dest_ip:<15} {dest_name:<12} {'❌':<8} {'-':<10}")
-                    fail += 1
-                    global_fail += 1
-            except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
+        for _, dest_ip, dest_name, ok, latency in results_per_host[origin]:
+            if ok:
+                print(f"{dest_ip:<15} {dest_name:<12} {'✔️':<8} {latency:>6.2f} ms")
+                success += 1
+                global_success += 1
+                global_latencies.append(latency)
+            else:
                 print(f"{dest_ip:<15} {dest_name:<12} {'❌':<8} {'-':<10}")
                 fail += 1
                 global_fail += 1
-        
-        _, peak = tracemalloc.get_traced_memory()
-        global_peak.append(peak)
-        tracemalloc.reset_peak()
 
         # Print summary for the current host
         total = success + fail
@@ -136,7 +219,6 @@ def test_connectivity(ip_to_container: dict, hosts: list) -> list:
         print("=" * 23 + f"{origin:^5}" + "=" * 22)
         print(f"│ {'Successes:':<20} {success:>21}/{total:<4}│")
         print(f"│ {'Loss Rate:':<20} {loss_percent:>24.2f}% │")
-        print(f"| {'Peak memory usage:': <20} {peak / 10**3:>22.2f} KB │")
         print("=" * 50)
 
     
@@ -158,9 +240,7 @@ def test_connectivity(ip_to_container: dict, hosts: list) -> list:
     else:
         print(f"│ {'Average Latency:':<20} {'N/A':>25} │")
 
-    if global_peak:
-        avg_peak = mean(global_peak)
-        print(f"│ {'Average Peak Memory:':<20} {avg_peak / 10**3:>22.2f} KB │")
+    print(f"│ {'Peak Memory:':<20} {peak / 10**3:>22.2f} KB │")
     print("=" * 50)
     
     print(f"\n{'Success Rate by Origin':^50}")
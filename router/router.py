@@ -1,18 +1,67 @@
+import atexit
 import time
 import psutil
 import socket
 import threading
 import json
 import os, sys
+import queue
+import signal
 import subprocess
-import ipaddress
+import struct
 import datetime
+import heapq
 
-def create_socket():
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Per-packet and per-route messages are only logged with ROUTER_DEBUG=1
+ROUTER_DEBUG = os.getenv("ROUTER_DEBUG") == "1"
+
+CONTAINER_NAME = os.getenv("CONTAINER_NAME")
+
+STDOUT_FD = sys.stdout.fileno()
+
+# Messages waiting to be written by the log_writer thread
+log_queue = queue.SimpleQueue()
+
+# Packets waiting to be processed or forwarded beyond this are dropped, like a full socket buffer
+PACKET_QUEUE_SIZE = 1024
+
+# Seconds to wait before retrying routes that failed to install, doubled on every
+# consecutive failure up to ROUTE_RETRY_MAX_INTERVAL
+ROUTE_RETRY_INTERVAL = 1
+ROUTE_RETRY_MAX_INTERVAL = 60
+
+def create_socket(broadcast: bool = False):
     """
     Creates and returns a UDP IPv4 socket.
+
+    Args:
+        broadcast (bool, optional): Allow sending to broadcast addresses (default: False)
     """
-    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if broadcast:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    return sock
+
+def encode_packet(packet: dict) -> bytes:
+    """
+    Serializes a packet dictionary into JSON bytes ready to be sent.
+    """
+    if orjson is not None:
+        return orjson.dumps(packet)
+    return json.dumps(packet).encode("utf-8")
+
+def decode_packet(data: memoryview) -> dict:
+    """
+    Parses a received JSON datagram into a packet dictionary.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
 
 def get_container_name():
     """
@@ -31,14 +80,36 @@ def get_container_name():
 
 def formated_printf(string: str):
     """
-    Prints a message with standardized format including container name.
+    Queues a message with standardized format including container name. Messages are
+    written to stdout by the log_writer thread, so callers never block on output.
+    """
+    log_queue.put(f"[{CONTAINER_NAME}] {string}\n")
+
+def flush_log(messages: list = None):
     """
+    Writes the given messages and every message still queued to stdout at once.
+
+    Args:
+        messages (list, optional): Messages already taken from the queue
+    """
+    messages = messages if messages is not None else []
     try:
-        container_name = os.getenv("CONTAINER_NAME")
-        with print_lock:
-            print(f"[{container_name}] {string}")
-    except NameError:
-        print(string)
+        while True:
+            messages.append(log_queue.get_nowait())
+    except queue.Empty:
+        pass
+
+    # Write straight to the file descriptor, bypassing sys.stdout's buffer and lock
+    data = "".join(messages).encode("utf-8")
+    while data:
+        data = data[os.write(STDOUT_FD, data):]
+
+def log_writer():
+    """
+    Waits for log messages and writes each burst of them to stdout in a single write.
+    """
+    while True:
+        flush_log([log_queue.get()])
 
 
 class LSDB:
@@ -53,6 +124,15 @@ class LSDB:
         _neighbors_ip (dict): Dictionary mapping neighbor IDs to their IP addresses
         _start_time (float): Timestamp when the LSDB was initialized
         _router_count (int): Count of known routers in the network
+        _version (int): Incremented every time the table changes
+        _paths (dict): Previous router per destination from the last dijkstra() run
+        _order (list): Routers in the order the last dijkstra() run settled them
+        _paths_version (int): Table version the cached paths were computed from
+        _changed (threading.Event): Set when the table changed and routes must be recalculated
+        _lock (threading.Lock): Serializes table changes and route recalculation
+        _installed_routes (dict): Gateway IP currently installed for each destination IP
+        _retry_delay (float): Seconds to wait before retrying routes that failed to install
+        _sequence_numbers (dict): Latest accepted sequence number per router, checked before the table
     """
 
     def __init__(self, router_id: str, neighbors_ip: dict[str, str]):
@@ -69,6 +149,15 @@ class LSDB:
         self._routing_table = {}  # Maps destinations to next hops
         self._start_time = time.time()
         self._router_count = 0
+        self._version = 0
+        self._paths = {}
+        self._order = []
+        self._paths_version = -1
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+        self._installed_routes = {}
+        self._retry_delay = ROUTE_RETRY_INTERVAL
+        self._sequence_numbers = {}
 
     def create_entry(self, sequence_number: int, timestamp: float, addresses: list[str], links: dict[str, int]) -> dict:
         """
@@ -88,11 +177,13 @@ class LSDB:
             "timestamp": timestamp,
             "addresses": addresses,
             "links": links,
+            "neighbors": list(links.items()),  # (neighbor, cost) pairs iterated by dijkstra()
         }
 
     def update(self, packet: dict) -> bool:
         """
-        Updates the routing table upon receiving a valid LSA packet.
+        Stores a valid LSA packet in the table and signals that routes must be
+        recalculated. The routing table itself is updated later by recalculate_loop().
 
         Args:
             packet (dict): LSA packet in dictionary format
@@ -102,32 +193,72 @@ class LSDB:
         """
         router_id = packet["router_id"]
         sequence_number = packet["sequence_number"]
-        entry = self._table.get(router_id)
 
         # Packet is invalid if we already have an equal or newer entry
-        if entry and sequence_number <= entry["sequence_number"]:
+        if sequence_number <= self._sequence_numbers.get(router_id, -1):
             return False
 
-        # Create new table entry
-        self._table[router_id] = self.create_entry(
-            sequence_number, packet["timestamp"], packet["addresses"], packet["links"])
-
-        # Check if network has converged (we know routes to all known routers)
-        self._router_count = len(self._table.keys())
-        self.recalculate_routes(packet["links"].keys())
+        with self._lock:
+            # Check again, another thread may have accepted a newer packet meanwhile
+            if sequence_number <= self._sequence_numbers.get(router_id, -1):
+                return False
+            self._sequence_numbers[router_id] = sequence_number
+            entry = self._table.get(router_id)
+
+            # A refresh with the same links and addresses cannot change any route
+            if entry and entry["links"] == packet["links"] and entry["addresses"] == packet["addresses"]:
+                entry["sequence_number"] = sequence_number
+                entry["timestamp"] = packet["timestamp"]
+                return True
+
+            # Create new table entry
+            self._table[router_id] = self.create_entry(
+                sequence_number, packet["timestamp"], packet["addresses"], packet["links"])
+            self._version += 1
+
+            # Check for unknown routers in observed routers
+            for neighbor in packet["links"].keys():
+                if neighbor not in self._table:
+                    formated_printf(f"[LSDB] Discovered new router: {neighbor}")
+                    self._table[neighbor] = self.create_entry(-1, 0, [], {})
+
+            # Check if network has converged (we know routes to all known routers)
+            self._router_count = len(self._table.keys())
+            self._changed.set()
 
         return True
 
-    def dijkstra(self) -> dict:
+    def expire(self, router_id: str):
+        """
+        Forgets the links and addresses advertised by a failed router, keeping an empty
+        entry for it so a later LSA from it is accepted again.
+
+        Args:
+            router_id (str): Unique identifier of the failed router
+        """
+        with self._lock:
+            self._sequence_numbers.pop(router_id, None)
+            entry = self._table.get(router_id)
+            if entry is None or entry["sequence_number"] != -1:
+                self._table[router_id] = self.create_entry(-1, 0, [], {})
+                self._version += 1
+                self._changed.set()
+
+    def dijkstra(self) -> tuple[dict, list]:
         """
         Calculates the shortest path between this router and all other known routers.
+        The result is cached until the table changes.
 
         Returns:
-            dict: Dictionary where keys are destination routers and values are previous routers
+            tuple: Contains:
+                - dictionary where keys are destination routers and values are previous routers
+                - list of reachable routers in the order they were settled (closest first)
         """
+        if self._paths_version == self._version:
+            return self._paths, self._order
+
         distances = {}
         paths = {}
-        visited = {}
 
         # Initialize dictionaries
         for router in self._table.keys():
@@ -136,91 +267,205 @@ class LSDB:
 
         distances[self._router_id] = 0
 
-        while len(visited) < len(self._table):
-            current_router = None
-            min_distance = float('inf')
-            
-            # Find the unvisited router with smallest distance
-            for node, distance in distances.items():
-                if node not in visited and distance < min_distance:
-                    current_router = node
-                    min_distance = distance
+        order = self._relax_with_heap(distances, paths)
 
-            if current_router is None:
-                break
+        self._paths = paths
+        self._order = order
+        self._paths_version = self._version
+        return paths, order
 
-            visited[current_router] = True
-            neighbors = self._table[current_router]["links"]
+    def _relax_with_heap(self, distances: dict, paths: dict) -> list:
+        """
+        Runs Dijkstra's algorithm using a binary heap as the priority queue.
 
-            # Update distances for neighboring routers
-            for neighbor, cost in neighbors.items():
-                if neighbor not in visited:
-                    total_cost = cost + distances[current_router]
-                    if total_cost < distances[neighbor]:
-                        distances[neighbor] = total_cost
-                        paths[neighbor] = current_router
+        Args:
+            distances (dict): Tentative distance per router, updated in place
+            paths (dict): Previous router per destination, updated in place
 
-        return paths
+        Returns:
+            list: Routers in the order they were settled
+        """
+        visited = {}  # Used as an ordered set
+        heap = [(0, self._router_id)]
+
+        # Bind lookups used in the loop to locals
+        table = self._table
+        router_count = len(distances)
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        while heap:
+            # Pop the unvisited router with smallest distance
+            distance, current_router = heappop(heap)
+            if current_router in visited:
+                continue  # Stale queue entry
+
+            visited[current_router] = None
+            if len(visited) == router_count:
+                break  # Every router is settled, remaining entries are stale
+            entry = table.get(current_router)
+            if entry is None:
+                continue
 
-    def update_next_hop(self, paths: dict):
+            # Update distances for neighboring routers
+            for neighbor, cost in entry["neighbors"]:
+                if neighbor in visited:
+                    continue
+                total_cost = cost + distance
+                if total_cost < distances.get(neighbor, -1):  # -1: router not in the table
+                    distances[neighbor] = total_cost
+                    paths[neighbor] = current_router
+                    heappush(heap, (total_cost, neighbor))
+
+        return list(visited)
+
+    def update_next_hop(self, paths: dict, order: list):
         """
-        Traverses the shortest paths to determine the next hop for each router from this router.
+        Determines the next hop for each router from this router in a single pass. Routers
+        are visited in the order Dijkstra settled them, so the next hop of a router's
+        predecessor is always known before the router itself.
 
         Args:
             paths (dict): Dictionary where keys are destination routers and values are previous routers
+            order (list): Reachable routers in the order they were settled
         """
+        next_hops = {}
+        for router in order:
+            previous = paths.get(router)
+            if previous is not None:
+                next_hops[router] = router if previous == self._router_id else next_hops[previous]
+
+        # Unreachable routers have no next hop
         for destination in paths.keys():
             if destination != self._router_id:
-                hop = destination
-                while hop is not None and paths[hop] != self._router_id:
-                    hop = paths[hop]
-                self._routing_table[destination] = hop
+                self._routing_table[destination] = next_hops.get(destination)
 
-        self._routing_table = dict(sorted(self._routing_table.items()))
-
-    def update_routes(self):
+    def update_routes(self) -> dict:
         """
-        Updates the routing table based on next hops found by update_next_hop().
+        Finds the routes to install based on next hops found by update_next_hop().
+        Only routes whose gateway changed since they were last installed are returned.
+
+        Returns:
+            dict: Destination IPs mapped to their new gateway IP
         """
+        changed_routes = {}
         for dest_router, gateway_router in list(self._routing_table.items()):
             if dest_router != self._router_id:
-                if gateway_router not in self._neighbors_ip:
-                    formated_printf(
-                        f"[LSDB] Ignoring route to {dest_router} via {gateway_router}: gateway not yet known")
+                # Read the gateway once, check_failures may remove it concurrently
+                gateway_ip = self._neighbors_ip.get(gateway_router)
+                if gateway_ip is None:
+                    if ROUTER_DEBUG:
+                        formated_printf(
+                            f"[LSDB] Ignoring route to {dest_router} via {gateway_router}: gateway not yet known")
                 else:
                     # Update route associating all neighbor IPs to the next hop
                     for dest_ip in self._table[dest_router]["addresses"]:
-                        gateway_ip = self._neighbors_ip[gateway_router]
+                        if self._installed_routes.get(dest_ip) != gateway_ip:
+                            changed_routes[dest_ip] = gateway_ip
 
-                        command = ["ip", "route", "replace",
-                                 dest_ip, "via", gateway_ip]
-                        try:
-                            subprocess.run(command, check=True)
-                            formated_printf(
-                                f"Route added: {dest_ip} -> {gateway_ip} [{gateway_router}]")
-                        except subprocess.CalledProcessError as e:
-                            formated_printf(
-                                f"[ERROR] Failed to add route: [{command}] -> [{e}] ({self._router_id} -> {gateway_router})")
+        return changed_routes
 
-    def recalculate_routes(self, observed_routers: list[str]):
+    def read_installed_routes(self) -> dict:
         """
-        Recalculates routes using Dijkstra's algorithm and applies them to the routing table.
+        Reads the gateway routes currently present in the kernel table.
+
+        Returns:
+            dict: Destination IPs mapped to their gateway IP
+        """
+        output = subprocess.run(
+            ["ip", "route", "show"], capture_output=True, text=True, check=True).stdout
+        routes = {}
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) >= 3 and fields[1] == "via":
+                routes[fields[0]] = fields[2]
+        return routes
+
+    def install_routes(self, routes: dict):
+        """
+        Installs routes through a single `ip -batch` invocation. If it fails, the kernel
+        table is read back to find which routes were not applied, and a new recalculation
+        is scheduled with a backoff capped at ROUTE_RETRY_MAX_INTERVAL to retry them.
 
         Args:
-            observed_routers (list[str]): List of observed routers
+            routes (dict): Destination IPs mapped to their gateway IP
         """
-        # Check for unknown routers in observed routers
-        for neighbor in observed_routers:
-            if neighbor not in self._table:
-                formated_printf(f"[LSDB] Discovered new router: {neighbor}")
-                self._table[neighbor] = self.create_entry(-1, 0, [], {})
+        if not routes:
+            return
+
+        # -force keeps applying the remaining routes if one of them fails
+        commands = "".join(
+            f"route replace {dest_ip} via {gateway_ip}\n" for dest_ip, gateway_ip in routes.items())
+        try:
+            subprocess.run(["ip", "-force", "-batch", "-"], input=commands, text=True, check=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            try:
+                kernel_routes = self.read_installed_routes()
+            except (subprocess.CalledProcessError, OSError):
+                kernel_routes = {}
+
+            failed = {}
+            for dest_ip, gateway_ip in routes.items():
+                if kernel_routes.get(dest_ip) == gateway_ip:
+                    self._installed_routes[dest_ip] = gateway_ip
+                else:
+                    failed[dest_ip] = gateway_ip
+
+            if failed:
+                formated_printf(
+                    f"[ERROR] Failed to add routes: "
+                    f"[{', '.join(f'{d} -> {g}' for d, g in failed.items())}] -> [{e}], "
+                    f"retrying in {self._retry_delay}s ({self._router_id})")
+                retry = threading.Timer(self._retry_delay, self._changed.set)
+                retry.daemon = True
+                retry.start()
+                self._retry_delay = min(self._retry_delay * 2, ROUTE_RETRY_MAX_INTERVAL)
+                return
+        else:
+            self._installed_routes.update(routes)
+
+        self._retry_delay = ROUTE_RETRY_INTERVAL
+        if ROUTER_DEBUG:
+            for dest_ip, gateway_ip in routes.items():
+                formated_printf(f"Route added: {dest_ip} -> {gateway_ip}")
+
+    def mark_dirty(self):
+        """
+        Schedules a route recalculation, e.g. when a new gateway becomes reachable.
+        """
+        self._changed.set()
 
-        # Calculate shortest paths to each router
-        paths = self.dijkstra()
-        # Determine next hops for each path
-        self.update_next_hop(paths)
-        # Update routing table
-        self.update_routes()
+    def recalculate_routes(self):
+        """
+        Recalculates routes using Dijkstra's algorithm and applies them to the routing table.
+        """
+        with self._lock:
+            self._changed.clear()
+            # Calculate shortest paths to each router
+            paths, order = self.dijkstra()
+            # Determine next hops for each path
+            self.update_next_hop(paths, order)
+            # Find routes whose gateway changed
+            changed_routes = self.update_routes()
+
+        # Installing forks a process, so it runs without holding up LSDB.update
+        # (only this thread touches _installed_routes)
+        self.install_routes(changed_routes)
+
+    def recalculate_loop(self, interval: float = 0.2):
+        """
+        Waits for table changes and recalculates routes. After a change it waits a short
+        interval so a burst of LSAs costs a single Dijkstra run.
+
+        Args:
+            interval (float, optional): Time to let further changes arrive, in seconds (default: 0.2)
+        """
+        while True:
+            self._changed.wait()
+            time.sleep(interval)
+            try:
+                self.recalculate_routes()
+            except Exception as e:
+                formated_printf(f"Error recalculating routes: {e}")
 
 class NeighborDiscovery:
     """
@@ -232,9 +477,12 @@ class NeighborDiscovery:
         _neighbors (dict): Dictionary of known neighbors
         _interval (int): Time interval between Discovery packets
         _PORT (int): UDP port for communication
+        _targets (list[tuple]): Local address and broadcast destination per interface
+        _sock (socket.socket): Broadcast-enabled UDP socket used to send Discovery packets
     """
 
-    def __init__(self, router_id: str, interfaces: list[dict[str, str]], neighbors: dict[str, str], interval: int = 10, PORT: int = 5000):
+    def __init__(self, router_id: str, interfaces: list[dict[str, str]], neighbors: dict[str, str], interval: int = 10, PORT: int = 5000,
+                 sock: socket.socket = None):
         """
         Initializes a new NeighborDiscovery instance.
 
@@ -246,19 +494,25 @@ class NeighborDiscovery:
             neighbors (dict[str, str]): Dictionary of known neighbors (key: neighbor ID, value: IP)
             interval (int, optional): Time interval between Discovery packets (default: 10)
             PORT (int, optional): UDP listening port (default: 5000)
+            sock (socket.socket, optional): Broadcast-enabled socket to send with (default: a new one)
         """
         self._router_id = router_id
         self._interfaces = interfaces
         self._neighbors = neighbors
         self._interval = interval
         self._PORT = PORT
+        # (local address, broadcast destination) for every interface with a broadcast address
+        self._targets = [
+            (item["address"], (item["broadcast"], PORT)) for item in interfaces if "broadcast" in item]
+        self._sock = sock if sock is not None else create_socket(broadcast=True)
 
-    def create_packet(self, ip_address: str) -> dict:
+    def create_packet(self, ip_address: str, known_neighbors: list[str]) -> dict:
         """
         Creates a Discovery packet.
 
         Args:
             ip_address (str): Local interface IP address
+            known_neighbors (list[str]): IDs of the neighbors detected so far
 
         Returns: 
             dict: Dictionary containing Discovery packet data
@@ -268,30 +522,25 @@ class NeighborDiscovery:
             "router_id": self._router_id,
             "timestamp": time.time(),
             "ip_address": ip_address,
-            "known_neighbors": list(self._neighbors.keys()),
+            "known_neighbors": known_neighbors,
         }
 
     def send_to_all_neighbors(self):
         """
         Starts periodic broadcast of Discovery packets.
         """
-        # Filter interfaces that have broadcast addresses
-        interfaces = [item for item in self._interfaces if "broadcast" in item]
-
-        sock = create_socket()
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-
         while True:
-            for interface_info in interfaces:
-                ip_address = interface_info["address"]
-                broadcast_ip = interface_info["broadcast"]
-
-                packet = self.create_packet(ip_address)
-                message = json.dumps(packet).encode("utf-8")
+            # Same neighbor list for every interface in this round
+            known_neighbors = list(self._neighbors.keys())
+            for ip_address, destination in self._targets:
+                broadcast_ip = destination[0]
+                packet = self.create_packet(ip_address, known_neighbors)
+                message = encode_packet(packet)
 
                 try:
-                    sock.sendto(message, (broadcast_ip, self._PORT))
-                    formated_printf(f"Discovery packet sent to {broadcast_ip} [broadcast]")
+                    self._sock.sendto(message, destination)
+                    if ROUTER_DEBUG:
+                        formated_printf(f"Discovery packet sent to {broadcast_ip} [broadcast]")
                 except Exception as e:
                     formated_printf(f"Error sending to {broadcast_ip}: {e}")
 
@@ -320,10 +569,15 @@ class LSASender:
         _started (bool): Flag indicating if sender is active
         _lsdb (LSDB): Link State Database reference
         _interfaces (list): List of network interfaces
+        _addresses (list): Interface addresses advertised in every LSA
+        _links (dict): Last neighbor costs snapshot advertised
+        _sock (socket.socket): UDP socket shared by the sending and forwarding paths
+        _forward_queue (queue.Queue): (packet, sender IP) pairs waiting to be forwarded
     """
 
     def __init__(self, router_id: str, neighbors_ip: dict[str, str], neighbors_cost: dict[str, int], 
-                 interfaces: list[dict[str, str]], lsdb: LSDB, interval: int = 30, PORT: int = 5000):
+                 interfaces: list[dict[str, str]], lsdb: LSDB, interval: int = 30, PORT: int = 5000,
+                 sock: socket.socket = None):
         """
         Initializes a new LSASender instance.
 
@@ -335,6 +589,7 @@ class LSASender:
             lsdb (LSDB): Link State Database reference
             interval (int, optional): Time between LSA packets (default: 30)
             PORT (int, optional): UDP port (default: 5000)
+            sock (socket.socket, optional): Socket to send with (default: a new one)
         """
         self._router_id = router_id
         self._neighbors_ip = neighbors_ip
@@ -345,6 +600,10 @@ class LSASender:
         self._started = False
         self._lsdb = lsdb
         self._interfaces = interfaces
+        self._addresses = [item["address"] for item in interfaces]
+        self._links = {}
+        self._sock = sock if sock is not None else create_socket()
+        self._forward_queue = queue.Queue(maxsize=PACKET_QUEUE_SIZE)
 
     @property
     def neighbors_ip(self):
@@ -366,49 +625,92 @@ class LSASender:
             "type": "LSA",
             "router_id": self._router_id,
             "timestamp": time.time(),
-            "addresses": [item["address"] for item in self._interfaces],
+            "addresses": self._addresses,
             "sequence_number": self._sequence_number,
-            "links": {neighbor_id: cost for (neighbor_id, cost) in self._neighbors_cost.items()}
+            "links": self.links()
         }
 
+    def links(self) -> dict:
+        """
+        Returns a snapshot of the current neighbor costs, reusing the previous one while
+        the neighbors have not changed.
+
+        Returns:
+            dict: Neighbor IDs mapped to link costs
+        """
+        if self._links != self._neighbors_cost:
+            self._links = dict(self._neighbors_cost)
+        return self._links
+
     def send_to_neighbors(self):
         """
         Starts periodic sending of LSA packets to all direct neighbors.
         """
-        sock = create_socket()
         while True:
             packet = self.create_packet()
             self._lsdb.update(packet)
-            message = json.dumps(packet).encode("utf-8")
+            message = encode_packet(packet)
 
             for neighbor_id, ip in self._neighbors_ip.items():
                 try:
-                    sock.sendto(message, (ip, self._PORT))
-                    formated_printf(f"LSA packet sent to {ip} [{neighbor_id}]")
+                    self._sock.sendto(message, (ip, self._PORT))
+                    if ROUTER_DEBUG:
+                        formated_printf(f"LSA packet sent to {ip} [{neighbor_id}]")
                 except Exception as e:
                     formated_printf(f"Error sending to [{neighbor_id}]: {e}")
 
             time.sleep(self._interval)
 
+    def forward(self, packet: dict, sender_ip: str):
+        """
+        Queues a received LSA packet to be forwarded by forward_loop().
+
+        Args: 
+            packet (dict): LSA packet in dictionary format
+            sender_ip (str): IP of the packet sender
+        """
+        try:
+            self._forward_queue.put_nowait((packet, sender_ip))
+        except queue.Full:
+            if ROUTER_DEBUG:
+                formated_printf(f"Forward queue full, dropping LSA from [{packet['router_id']}]")
+
+    def forward_loop(self):
+        """
+        Forwards queued LSA packets to neighbors.
+        """
+        while True:
+            packet, sender_ip = self._forward_queue.get()
+            try:
+                self.forward_to_neighbors(packet, sender_ip)
+            except Exception as e:
+                formated_printf(f"Error forwarding packet: {e}")
+
     def forward_to_neighbors(self, packet: dict, sender_ip: str):
         """
-        Forwards received LSA packets to all neighbors except the original sender.
+        Forwards received LSA packets to all neighbors except the one it came from and the
+        router that originated it, which both already have it.
 
         Args: 
             packet (dict): LSA packet in dictionary format
             sender_ip (str): IP of the packet sender
         """
-        sock = create_socket()
-        message = json.dumps(packet).encode("utf-8")
+        origin_id = packet["router_id"]
 
-        # Create list of neighbors to receive the packet (excluding sender)
+        # Create list of neighbors to receive the packet (excluding sender and originator)
         neighbors_list = [
-            (neighbor_id, ip) for neighbor_id, ip in self._neighbors_ip.items() if ip != sender_ip]
+            (neighbor_id, ip) for neighbor_id, ip in self._neighbors_ip.items()
+            if ip != sender_ip and neighbor_id != origin_id]
+        if not neighbors_list:
+            return
+
+        message = encode_packet(packet)
 
         for neighbor_id, ip in neighbors_list:
             try:
-                sock.sendto(message, (ip, self._PORT))
-                formated_printf(f"LSA packet forwarded to {ip} [{neighbor_id}]")
+                self._sock.sendto(message, (ip, self._PORT))
+                if ROUTER_DEBUG:
+                    formated_printf(f"LSA packet forwarded to {ip} [{neighbor_id}]")
             except Exception as e:
                 formated_printf(f"Error forwarding to [{neighbor_id}]: {e}")
 
@@ -439,6 +741,8 @@ class Router:
         _detected_neighbors (dict): Neighbors detected via Discovery
         _recognized_neighbors (dict): Bidirectionally recognized neighbors
         _neighbor_manager (NeighborManager): Neighbor management component
+        _packets (queue.Queue): Received (packet, sender IP) pairs waiting to be processed
+        _send_sock (socket.socket): UDP socket shared by the Discovery and LSA senders
     """
 
     def __init__(self, router_id: str, PORT: int = 5000, BUFFER_SIZE: int = 4096):
@@ -456,51 +760,76 @@ class Router:
         self._BUFFER_SIZE = BUFFER_SIZE
         self._detected_neighbors = {}  # Neighbors detected via Discovery
         self._recognized_neighbors = {}  # Bidirectionally recognized neighbors
+        self._send_sock = create_socket(broadcast=True)  # Shared by every sender
         
         self._discovery = NeighborDiscovery(
-            self._router_id, self._interfaces, self._detected_neighbors
+            self._router_id, self._interfaces, self._detected_neighbors,
+            PORT=PORT, sock=self._send_sock
         )
 
         self._lsdb = LSDB(router_id, self._recognized_neighbors)
         self._lsa = LSASender(
             self._router_id, self._recognized_neighbors,
-            self._detected_neighbors, self._interfaces, self._lsdb
+            self._detected_neighbors, self._interfaces, self._lsdb,
+            PORT=PORT, sock=self._send_sock
         )
         self._neighbor_manager = NeighborManager(
             self._router_id, self._lsa, self._lsdb
         )
+        self._packets = queue.Queue(maxsize=PACKET_QUEUE_SIZE)
 
     def receive_packets(self):
         """
         Starts listening for UDP packets on the defined port.
-        Handles Discovery and LSA packets.
+        Decodes Discovery and LSA packets and queues them for process_packets().
         """
         sock = create_socket()
         sock.bind(("", self._PORT))
+        # Datagrams are received into one reusable buffer instead of a new bytes object each
+        buffer = bytearray(self._BUFFER_SIZE)
+        view = memoryview(buffer)
 
         while True:
             try:
-                data, address = sock.recvfrom(self._BUFFER_SIZE)
-                message = data.decode("utf-8")
-                packet = json.loads(message)
+                size, address = sock.recvfrom_into(buffer)
+                packet = decode_packet(view[:size])
                 packet_type = packet.get("type")
                 sender_id = packet.get("router_id")
                 
                 if sender_id != self._router_id:
                     sender_ip = address[0]
-                    formated_printf(
-                        f"{packet_type} packet received from {sender_ip} [{sender_id}]")
+                    if ROUTER_DEBUG:
+                        formated_printf(
+                            f"{packet_type} packet received from {sender_ip} [{sender_id}]")
 
-                    if packet_type == "Discovery":
-                        self._neighbor_manager.process_discovery_packet(
-                            packet, sender_ip)
-                    elif packet_type == "LSA":
-                        self._neighbor_manager.process_lsa(
-                            packet, sender_ip)
+                    try:
+                        self._packets.put_nowait((packet, sender_ip))
+                    except queue.Full:
+                        if ROUTER_DEBUG:
+                            formated_printf(f"Packet queue full, dropping {packet_type} from [{sender_id}]")
 
             except Exception as e:
                 formated_printf(f"Error receiving packet: {e}")
 
+    def process_packets(self):
+        """
+        Processes queued Discovery and LSA packets, so slow processing never delays
+        reading from the socket.
+        """
+        while True:
+            packet, sender_ip = self._packets.get()
+            try:
+                packet_type = packet.get("type")
+                if packet_type == "Discovery":
+                    self._neighbor_manager.process_discovery_packet(
+                        packet, sender_ip)
+                elif packet_type == "LSA":
+                    self._neighbor_manager.process_lsa(
+                        packet, sender_ip)
+
+            except Exception as e:
+                formated_printf(f"Error processing packet: {e}")
+
     def list_addresses(self) -> list[dict]:
         """
         Lists IP addresses of the system's network interfaces.
@@ -517,12 +846,10 @@ class Router:
                 for address in addresses:
                     if address.family == socket.AF_INET:
                         if address.address.startswith("192"):
-                            ip = ipaddress.ip_address(address.address)
-                            network = ipaddress.IPv4Network(
-                                f"{ip}/24", strict=False)
+                            ip = struct.unpack("!I", socket.inet_aton(address.address))[0]
+                            network = socket.inet_ntoa(struct.pack("!I", ip & 0xFFFFFF00))
 
-                            interfaces_list.append(
-                                {"address": f"{network.network_address}/24"})
+                            interfaces_list.append({"address": f"{network}/24"})
                         else:
                             interfaces_list.append(
                                 {"address": address.address,
@@ -533,9 +860,10 @@ class Router:
     def start(self):
         """
         Starts router operation:
-        - Initializes packet listening thread
+        - Initializes packet listening, processing and LSA forwarding threads
         - Starts periodic Discovery packet sending
-        - Maintains process with infinite loop
+        - Starts neighbor failure detection and route recalculation threads
+        - Blocks the main thread until the process is signalled
         """
         receiver_thread = threading.Thread(
             target=self.receive_packets, 
@@ -543,6 +871,18 @@ class Router:
         )
         receiver_thread.start()
 
+        processor_thread = threading.Thread(
+            target=self.process_packets, 
+            daemon=True
+        )
+        processor_thread.start()
+
+        forward_thread = threading.Thread(
+            target=self._lsa.forward_loop, 
+            daemon=True
+        )
+        forward_thread.start()
+
         self._discovery.start()
 
         failure_thread = threading.Thread(
@@ -551,8 +891,13 @@ class Router:
         )
         failure_thread.start()
 
-        while True:
-            time.sleep(1)
+        routes_thread = threading.Thread(
+            target=self._lsdb.recalculate_loop, 
+            daemon=True
+        )
+        routes_thread.start()
+
+        signal.pause()
 
 class NeighborManager:
     """
@@ -565,6 +910,7 @@ class NeighborManager:
         _detected_neighbors (dict): Neighbors detected via Discovery
         _recognized_neighbors (dict): Bidirectionally recognized neighbors
         _discovery_timestamps (dict): Timestamps of last Discovery from neighbors
+        _costs (dict): Link cost per neighbor, read from the environment once
     """
 
     def __init__(self, router_id: str, lsa: LSASender, lsdb: LSDB):
@@ -582,6 +928,7 @@ class NeighborManager:
         self._detected_neighbors = lsa.neighbors_cost
         self._recognized_neighbors = lsa.neighbors_ip
         self._discovery_timestamps = {}
+        self._costs = {}
 
     def process_discovery_packet(self, packet: dict, sender_ip: str):
         """
@@ -602,6 +949,7 @@ class NeighborManager:
         # If sender recognizes this router and we haven't registered it yet
         if (self._router_id in neighbors) and (sender_id not in self._recognized_neighbors):
             self._recognized_neighbors[sender_id] = sender_ip
+            self._lsdb.mark_dirty()
             self._lsa.start()
 
     def process_lsa(self, packet: dict, sender_ip: str):
@@ -614,7 +962,7 @@ class NeighborManager:
         """
         valid_packet = self._lsdb.update(packet)
         if valid_packet:
-            self._lsa.forward_to_neighbors(packet, sender_ip)
+            self._lsa.forward(packet, sender_ip)
 
     def get_cost(self, router_id: str, neighbor_id: str) -> int:
         """
@@ -627,10 +975,12 @@ class NeighborManager:
         Returns:
             int: Link cost (defaults to 1 if not specified)
         """
-        cost = os.getenv(f"CONNECTED_TO_ROUTER_{neighbor_id}")
+        cost = self._costs.get(neighbor_id)
         if cost is None:
-            cost = 1
-        return int(cost)
+            # Environment does not change at runtime, so each neighbor is looked up once
+            cost = int(os.getenv(f"CONNECTED_TO_ROUTER_{neighbor_id}", 1))
+            self._costs[neighbor_id] = cost
+        return cost
 
     def check_failures(self, hello_interval: int = 10, tolerance: int = 3):
         """
@@ -657,10 +1007,8 @@ class NeighborManager:
                 if router_id in self._recognized_neighbors:
                     del self._recognized_neighbors[router_id]
 
-                if router_id in self._lsdb._table:
-                    del self._lsdb._table[router_id]
+                self._lsdb.expire(router_id)
 
-            self._lsdb.recalculate_routes(failed_routers)
             time.sleep(1)
 
 
@@ -668,8 +1016,9 @@ def main():
     """
     Main function to start the router operation.
     """
-    # Set line buffering for stdout
-    sys.stdout.reconfigure(line_buffering=True)
+    # Log messages are written by a dedicated thread; whatever is left is written on exit
+    threading.Thread(target=log_writer, daemon=True).start()
+    atexit.register(flush_log)
 
     # Get container name from environment variable
     container_name = get_container_name()